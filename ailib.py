@@ -1,6 +1,12 @@
+import bisect
+import functools
+import heapq
+import itertools
+import sys
 from enum import Enum
+from collections import defaultdict
 from datetime import date, timedelta
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Set, Iterable, Tuple
 
 # Enums for status
 class BookStatus(Enum):
@@ -8,14 +14,39 @@ class BookStatus(Enum):
     CHECKED_OUT = "checked_out"
     RESERVED = "reserved"
 
+# Enum members are singletons, so status checks use identity against this
+_AVAILABLE = BookStatus.AVAILABLE
+# Statuses that count as an active loan
+_ACTIVE_STATUSES = frozenset({BookStatus.CHECKED_OUT})
+
+# Orders reservations first-come-first-served; also keeps members from being compared
+_reservation_counter = itertools.count()
+
+# Loan period (days) -> timedelta, reused across checkouts
+_LOAN_TIMEDELTAS: Dict[int, timedelta] = {}
+
 # Book class
 class Book:
+    __slots__ = ('isbn', 'title', 'author', 'subject', 'publication_date',
+                 '_title_lc', '_author_lc', '_subject_lc')
+    
     def __init__(self, isbn: str, title: str, author: str, subject: str, publication_date: date):
         self.isbn = isbn
         self.title = title
         self.author = author
         self.subject = subject
         self.publication_date = publication_date
+        # Lowercased copies used by catalog searches
+        self._title_lc = title.lower()
+        self._author_lc = author.lower()
+        self._subject_lc = subject.lower()
+    
+    # Books are identified by ISBN
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Book) and self.isbn == other.isbn
+    
+    def __hash__(self) -> int:
+        return hash(self.isbn)
     
     def get_details(self) -> Dict:
         return {
@@ -28,25 +59,46 @@ class Book:
 
 # BookItem class
 class BookItem:
+    __slots__ = ('item_id', 'book', 'rack_number', 'status', '_due_date', 'borrower',
+                 'borrowed_date', 'reserved_by', '_library', '_reservation_queue')
+    
     def __init__(self, item_id: str, book: Book, rack_number: str):
         self.item_id = item_id
         self.book = book
         self.rack_number = rack_number
         self.status = BookStatus.AVAILABLE
-        self.due_date: Optional[date] = None
+        self._due_date: Optional[date] = None
         self.borrower: Optional['Member'] = None
         self.borrowed_date: Optional[date] = None
         self.reserved_by: Optional['Member'] = None
+        self._library: Optional['Library'] = None  # Set by Library.add_book_item
+        # Heap of members waiting for this copy, earliest reservation first
+        self._reservation_queue: List[Tuple[int, 'Member']] = []
+    
+    @property
+    def due_date(self) -> Optional[date]:
+        return self._due_date
+    
+    @due_date.setter
+    def due_date(self, value: Optional[date]):
+        # Re-index active loans so the library's due-date order stays correct
+        library = self._library
+        if library is not None and self in library._checked_out_items:
+            library._remove_loan(self)
+            self._due_date = value
+            library._add_loan(self)
+        else:
+            self._due_date = value
     
     def is_available(self) -> bool:
-        return self.status == BookStatus.AVAILABLE and self.reserved_by is None
+        return self.status is _AVAILABLE and self.reserved_by is None
     
     def check_out(self, member: 'Member', checkout_date: date = None, loan_period_days: int = 14) -> bool:
         if checkout_date is None:
             checkout_date = date.today()
             
-        # Check if book is available and member hasn't exceeded checkout limit
-        if not self.is_available():
+        # Check if book is on the shelf and member hasn't exceeded checkout limit
+        if self.status is not _AVAILABLE:
             return False
             
         if len(member.checked_out_books) >= 5:
@@ -61,12 +113,17 @@ class BookItem:
         self.status = BookStatus.CHECKED_OUT
         self.borrower = member
         self.borrowed_date = checkout_date
-        self.due_date = checkout_date + timedelta(days=loan_period_days)
+        loan_period = _LOAN_TIMEDELTAS.get(loan_period_days)
+        if loan_period is None:
+            loan_period = _LOAN_TIMEDELTAS[loan_period_days] = timedelta(days=loan_period_days)
+        self.due_date = checkout_date + loan_period
         self.reserved_by = None  # Clear reservation
         
-        member.checked_out_books.append(self)
-        if self in member.reserved_books:
-            member.reserved_books.remove(self)
+        member.checked_out_books.add(self)
+        member.reserved_books.discard(self)
+        if self._library is not None:
+            self._library._add_loan(self)
+            self._library._reserved_items.discard(self)
             
         return True
     
@@ -75,12 +132,13 @@ class BookItem:
         if return_date is None:
             return_date = date.today()
             
-        if self.status != BookStatus.CHECKED_OUT or not self.borrower:
+        if self.status not in _ACTIVE_STATUSES or not self.borrower:
             return False
             
         # Remove from member's checked out books
-        if self in self.borrower.checked_out_books:
-            self.borrower.checked_out_books.remove(self)
+        self.borrower.checked_out_books.discard(self)
+        if self._library is not None:
+            self._library._remove_loan(self)
         
         # Reset book item status
        
@@ -90,32 +148,67 @@ class BookItem:
         self.borrowed_date = None
         self.due_date = None
         
+        # Hold the copy for the next member in line
+        if self._reservation_queue:
+            _, next_member = heapq.heappop(self._reservation_queue)
+            self.reserved_by = next_member
+            if self._library is not None:
+                self._library._reserved_items.add(self)
+                self._library.notification_service.notify_availability(next_member, self)
+            else:
+                NotificationService.notify_availability(next_member, self)
+        
         return True
     
     def reserve(self, member: 'Member') -> bool:
-        if self.reserved_by:
-            print("Book is already reserved by another member")
-            return False
-            
         if self.borrower == member:
             print("You cannot reserve a book you've already checked out")
             return False
         
-        if self.status == BookStatus.AVAILABLE:
+        if self in member.reserved_books:
+            print("You have already reserved this book")
+            return False
+        
+        if self.is_available():
             self.reserved_by = member
-            member.reserved_books.append(self)
-            return True
-            
-        return False
+            if self._library is not None:
+                self._library._reserved_items.add(self)
+        else:
+            # Checked out or held for someone else: join the queue
+            heapq.heappush(self._reservation_queue, (next(_reservation_counter), member))
+        
+        member.reserved_books.add(self)
+        return True
 
 # Fine class
 class Fine:
+    __slots__ = ('member', 'book_item', 'amount', 'date_issued', '_paid')
+    
     def __init__(self, member: 'Member', book_item: BookItem, amount: float, date_issued: date):
         self.member = member
         self.book_item = book_item
         self.amount = amount
         self.date_issued = date_issued
-        self.paid = False
+        self._paid = False
+    
+    # Paying goes through mark_paid() so the member's unpaid view stays in sync
+    @property
+    def paid(self) -> bool:
+        return self._paid
+    
+    @paid.setter
+    def paid(self, value: bool):
+        if value:
+            self.mark_paid()
+        elif self._paid:
+            self._paid = False
+            self.member._track_unpaid_fine(self)
+    
+    def mark_paid(self):
+        if self._paid:
+            return
+        self._paid = True
+        self.member._remove_unpaid_fine(self)
     
     @staticmethod
     def calculate_fine(days_overdue: int, fine_rate: float) -> float:
@@ -123,13 +216,20 @@ class Fine:
 
 # Member class
 class Member:
+    __slots__ = ('member_id', 'name', 'address', 'checked_out_books', 'reserved_books', '_fines',
+                 '_unpaid_fines', '_unpaid_total')
+    
     def __init__(self, member_id: str, name: str, address: str):
         self.member_id = member_id
         self.name = name
         self.address = address
-        self.checked_out_books: List[BookItem] = []
-        self.reserved_books: List[BookItem] = []
-        self.fines: List[Fine] = []
+        self.checked_out_books: Set[BookItem] = set()
+        self.reserved_books: Set[BookItem] = set()
+        self._fines: List[Fine] = []
+        # Running view of unpaid fines, maintained by add_fine / Fine.mark_paid.
+        # A dict keeps insertion order with O(1) removal.
+        self._unpaid_fines: Dict[Fine, None] = {}
+        self._unpaid_total = 0.0
     
     def check_out_book(self, book_item: BookItem) -> bool:
         return book_item.check_out(self)
@@ -141,34 +241,119 @@ class Member:
     def reserve_book(self, book_item: BookItem) -> bool:
         return book_item.reserve(self)
     
+    # Read-only so every fine goes through add_fine and is counted in the unpaid view
+    @property
+    def fines(self) -> Tuple[Fine, ...]:
+        return tuple(self._fines)
+    
+    def add_fine(self, fine: Fine):
+        self._fines.append(fine)
+        if not fine.paid:
+            self._track_unpaid_fine(fine)
+    
+    def _track_unpaid_fine(self, fine: Fine):
+        if fine in self._unpaid_fines:
+            return
+        self._unpaid_fines[fine] = None
+        self._unpaid_total += fine.amount
+    
+    def _remove_unpaid_fine(self, fine: Fine):
+        # A fine that was never added to this member isn't tracked
+        if fine not in self._unpaid_fines:
+            return
+        del self._unpaid_fines[fine]
+        # Reset once settled so float rounding doesn't accumulate
+        self._unpaid_total = self._unpaid_total - fine.amount if self._unpaid_fines else 0.0
+    
     def get_fines(self) -> List[Fine]:
-        return [fine for fine in self.fines if not fine.paid]
+        return list(self._unpaid_fines)
     
     def get_total_fine_amount(self) -> float:
-        return sum(fine.amount for fine in self.get_fines())
+        return self._unpaid_total
+    
+    def format_notification(self, message: str) -> str:
+        return f"Notification for {self.name}: {message}"
     
     def receive_notification(self, message: str):
-        print(f"Notification for {self.name}: {message}")
+        print(self.format_notification(message))
 
 # Catalog class
 class Catalog:
     def __init__(self):
         self.books: List[Book] = []
+        self._book_by_isbn: Dict[str, Book] = {}
+        # Lowercased search fields kept parallel to self.books
+        self._titles_lc: List[str] = []
+        self._authors_lc: List[str] = []
+        self._subjects_lc: List[str] = []
+        # Trigram -> positions in self.books, one index per searchable field
+        self._title_trigrams: Dict[str, Set[int]] = defaultdict(set)
+        self._author_trigrams: Dict[str, Set[int]] = defaultdict(set)
+        self._subject_trigrams: Dict[str, Set[int]] = defaultdict(set)
+        self._books_by_publication_date: Dict[date, List[Book]] = defaultdict(list)
     
     def add_book(self, book: Book):
+        position = len(self.books)
         self.books.append(book)
+        self._book_by_isbn.setdefault(book.isbn, book)
+        self._titles_lc.append(book._title_lc)
+        self._authors_lc.append(book._author_lc)
+        self._subjects_lc.append(book._subject_lc)
+        self._index_trigrams(self._title_trigrams, book._title_lc, position)
+        self._index_trigrams(self._author_trigrams, book._author_lc, position)
+        self._index_trigrams(self._subject_trigrams, book._subject_lc, position)
+        self._books_by_publication_date[book.publication_date].append(book)
+    
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    
+    @staticmethod
+    def _index_trigrams(index: Dict[str, Set[int]], text: str, position: int):
+        for gram in Catalog._trigrams(text):
+            index[gram].add(position)
+    
+    def _candidates(self, index: Dict[str, Set[int]], needle: str, ordered: bool = True) -> Iterable[int]:
+        # Queries shorter than a trigram can't use the index
+        if len(needle) < 3:
+            return range(len(self.books))
+        postings = []
+        for gram in self._trigrams(needle):
+            posting = index.get(gram)
+            if not posting:
+                return ()
+            postings.append(posting)
+        postings.sort(key=len)
+        positions = postings[0].intersection(*postings[1:])
+        return sorted(positions) if ordered else positions
+    
+    def _search(self, index: Dict[str, Set[int]], fields: List[str], query: str) -> List[Book]:
+        needle = query.lower()
+        books = self.books
+        return [books[i] for i in self._candidates(index, needle) if needle in fields[i]]
     
     def search_by_title(self, title: str) -> List[Book]:
-        return [book for book in self.books if title.lower() in book.title.lower()]
+        return self._search(self._title_trigrams, self._titles_lc, title)
     
     def search_by_author(self, author: str) -> List[Book]:
-        return [book for book in self.books if author.lower() in book.author.lower()]
+        return self._search(self._author_trigrams, self._authors_lc, author)
     
     def search_by_subject(self, subject: str) -> List[Book]:
-        return [book for book in self.books if subject.lower() in book.subject.lower()]
+        return self._search(self._subject_trigrams, self._subjects_lc, subject)
+    
+    def search_by_isbn(self, isbn: str) -> Optional[Book]:
+        return self._book_by_isbn.get(isbn)
+    
+    def find_by_title(self, title: str) -> Optional[Book]:
+        # Returns any matching book; candidates are left unsorted and checked until the first hit
+        needle = title.lower()
+        titles = self._titles_lc
+        candidates = self._candidates(self._title_trigrams, needle, ordered=False)
+        position = next((i for i in candidates if needle in titles[i]), None)
+        return None if position is None else self.books[position]
     
     def search_by_publication_date(self, publication_date: date) -> List[Book]:
-        return [book for book in self.books if book.publication_date == publication_date]
+        return list(self._books_by_publication_date.get(publication_date, ()))
 
 # Notification Service
 class NotificationService:
@@ -177,34 +362,40 @@ class NotificationService:
         message = f"The book '{book_item.book.title}' you reserved is now available for checkout."
         member.receive_notification(message)
     
+    # With out given, the formatted line is appended there for the caller to write in bulk
     @staticmethod
-    def notify_overdue(member: Member, book_item: BookItem):
-        days_overdue = (date.today() - book_item.due_date).days
+    def notify_overdue(member: Member, book_item: BookItem, today: date = None, out: Optional[List[str]] = None):
+        if today is None:
+            today = date.today()
+        days_overdue = (today - book_item.due_date).days
         message = f"The book '{book_item.book.title}' is {days_overdue} days overdue. Please return it to avoid additional fines."
-        member.receive_notification(message)
+        if out is None:
+            member.receive_notification(message)
+        else:
+            out.append(member.format_notification(message) + "\n")
 
-# Library class (Singleton pattern)
+# Library class. Library.get_instance() returns the shared library;
+# calling Library() directly creates a new, empty one.
 class Library:
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Library, cls).__new__(cls)
-            cls._instance.initialized = False
-        return cls._instance
-    
     def __init__(self):
-        if not self.initialized:
-            self.books: List[Book] = []
-            self.book_items: List[BookItem] = []
-            self.members: List[Member] = []
-            self.catalog = Catalog()
-            self.notification_service = NotificationService()
-            self.fine_rate_per_day = 0.50  # $0.50 per day
-            self.initialized = True
+        self.books: List[Book] = []
+        self.book_items: List[BookItem] = []
+        self.members: List[Member] = []
+        self._book_items_by_id: Dict[str, BookItem] = {}
+        self._members_by_id: Dict[str, Member] = {}
+        self._items_by_isbn: Dict[str, List[BookItem]] = defaultdict(list)
+        # Kept up to date by BookItem.check_out / return_book / reserve
+        self._checked_out_items: Set[BookItem] = set()
+        self._reserved_items: Set[BookItem] = set()
+        # Active loans as (due_date, id(item), item), sorted by due date
+        self._loans_by_due: List[Tuple[date, int, BookItem]] = []
+        self.catalog = Catalog()
+        self.notification_service = NotificationService()
+        self.fine_rate_per_day = 0.50  # $0.50 per day
     
     @staticmethod
-    def get_instance():
+    @functools.lru_cache(maxsize=1)
+    def get_instance() -> 'Library':
         return Library()
     
     def add_book(self, book: Book):
@@ -212,16 +403,50 @@ class Library:
         self.catalog.add_book(book)
     
     def add_book_item(self, book_item: BookItem):
+        if book_item._library is not None and book_item._library is not self:
+            raise ValueError(f"Book item {book_item.item_id} already belongs to another library")
+        if book_item.item_id in self._book_items_by_id:
+            raise ValueError(f"Book item with ID {book_item.item_id} already exists")
         self.book_items.append(book_item)
+        self._book_items_by_id[book_item.item_id] = book_item
+        self._items_by_isbn[book_item.book.isbn].append(book_item)
+        book_item._library = self
+        if book_item.status in _ACTIVE_STATUSES:
+            self._add_loan(book_item)
+        if book_item.reserved_by is not None:
+            self._reserved_items.add(book_item)
+    
+    def _add_loan(self, book_item: BookItem):
+        if book_item in self._checked_out_items:
+            return
+        self._checked_out_items.add(book_item)
+        # insort is O(n) for the list shift; the overdue sweep is what gets cheaper
+        if book_item.due_date is not None:
+            bisect.insort(self._loans_by_due, (book_item.due_date, id(book_item), book_item))
+    
+    def _remove_loan(self, book_item: BookItem):
+        # Must run before the item's due date is cleared
+        if book_item not in self._checked_out_items:
+            return
+        self._checked_out_items.discard(book_item)
+        if book_item.due_date is not None:
+            loans = self._loans_by_due
+            # (due_date, id) prefix locates the entry without comparing items
+            index = bisect.bisect_left(loans, (book_item.due_date, id(book_item)))
+            if index < len(loans) and loans[index][2] is book_item:
+                del loans[index]
     
     def add_member(self, member: Member):
+        if member.member_id in self._members_by_id:
+            raise ValueError(f"Member with ID {member.member_id} already exists")
         self.members.append(member)
+        self._members_by_id[member.member_id] = member
     
     def find_book_item_by_id(self, item_id: str) -> Optional[BookItem]:
-        return next((item for item in self.book_items if item.item_id == item_id), None)
+        return self._book_items_by_id.get(item_id)
     
     def find_member_by_id(self, member_id: str) -> Optional[Member]:
-        return next((member for member in self.members if member.member_id == member_id), None)
+        return self._members_by_id.get(member_id)
     
     def calculate_fine(self, book_item: BookItem, return_date: date = None) -> Optional[Fine]:
         if return_date is None:
@@ -235,37 +460,50 @@ class Library:
         
         if fine_amount > 0:
             fine = Fine(book_item.borrower, book_item, fine_amount, return_date)
-            book_item.borrower.fines.append(fine)
+            book_item.borrower.add_fine(fine)
             return fine
             
         return None
     
     def send_overdue_notifications(self):
         today = date.today()
-        for book_item in self.book_items:
-            if (book_item.status == BookStatus.CHECKED_OUT and 
-                book_item.due_date and 
-                today > book_item.due_date and 
-                book_item.borrower):
-                self.notification_service.notify_overdue(book_item.borrower, book_item)
+        notify = self.notification_service.notify_overdue
+        loans = self._loans_by_due
+        # Loans are sorted by due date, so the overdue ones form a prefix
+        overdue_count = bisect.bisect_left(loans, (today,))
+        out: List[str] = []
+        try:
+            for _, _, book_item in loans[:overdue_count]:
+                borrower = book_item.borrower
+                if borrower and book_item.due_date < today:
+                    notify(borrower, book_item, today, out=out)
+        finally:
+            # One write for the whole sweep instead of a print per notice
+            if out:
+                sys.stdout.write("".join(out))
     
     def get_available_book_items(self, book: Book) -> List[BookItem]:
-        return [item for item in self.book_items 
-                if item.book == book and item.is_available()]
+        return [item for item in self._items_by_isbn.get(book.isbn, ()) if item.is_available()]
     
     def display_library_stats(self):
-        print("\n=== Library Statistics ===")
-        print(f"Total Books: {len(self.books)}")
-        print(f"Total Book Items: {len(self.book_items)}")
-        print(f"Total Members: {len(self.members)}")
-        
-        available_items = sum(1 for item in self.book_items if item.is_available())
-        checked_out_items = sum(1 for item in self.book_items if item.status == BookStatus.CHECKED_OUT)
-        reserved_items = sum(1 for item in self.book_items if item.reserved_by is not None)
+        # Relies on each item being registered once (add_book_item rejects duplicate IDs) and
+        # changing status only through check_out / return_book / reserve. Checked out and held
+        # items are then disjoint, since checking out clears a hold.
+        checked_out_items = len(self._checked_out_items)
+        held_items = len(self._reserved_items)
+        available_items = len(self.book_items) - checked_out_items - held_items
+        # Reserved items are held copies plus checked-out copies with members queued for them
+        reserved_items = held_items + sum(1 for item in self._checked_out_items if item._reservation_queue)
         
-        print(f"Available Items: {available_items}")
-        print(f"Checked Out Items: {checked_out_items}")
-        print(f"Reserved Items: {reserved_items}")
+        print("\n".join([
+            "\n=== Library Statistics ===",
+            f"Total Books: {len(self.books)}",
+            f"Total Book Items: {len(self.book_items)}",
+            f"Total Members: {len(self.members)}",
+            f"Available Items: {available_items}",
+            f"Checked Out Items: {checked_out_items}",
+            f"Reserved Items: {reserved_items}",
+        ]))
 
 # Example usage and testing
 if __name__ == "__main__":
@@ -325,6 +563,6 @@ if __name__ == "__main__":
     print("\n=== Return Process ===")
     if member1.return_book(item1):
         print(f"Successfully returned '{item1.book.title}' from {member1.name}")
-        # Notify reserved member that book is available
-        if item1.book and member2 in [member for member in library.members if item1 in member.reserved_books]:
-            library.notification_service.notify_availability(member2, item1)
\ No newline at end of file
+        # Returning the book notifies the next member in the reservation queue
+        if item1.reserved_by is member2:
+            print(f"'{item1.book.title}' is now held for {member2.name}")
\ No newline at end of file